@@ -1,14 +1,54 @@
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
+import queue
+import logging
 from pathlib import Path
 import sys
-import io
+import os
+import platform
+import time
+import PIL
 from PIL import Image, ImageTk
-from overlay_logo import stamp_folder, VerticalPosition, HorizontalPosition, _process_logo_on_image
+from overlay_logo import stamp_folder, VerticalPosition, HorizontalPosition, _process_logo_on_image, _to_compositing_mode, _opacity_lut
 
 #TODO: rate limit openai problem
 
+def check_pillow_simd():
+    """Print a one-time hint when vanilla Pillow is used on x86 Linux/macOS, where Pillow-SIMD is much faster"""
+    # Pillow-SIMD has no Windows wheels and can't be swapped into a frozen executable
+    if getattr(sys, 'frozen', False) or platform.system() == 'Windows':
+        return
+    # Pillow-SIMD releases are versioned as post releases of Pillow (e.g. 9.5.0.post1)
+    if platform.machine().lower() in ('x86_64', 'amd64') and '.post' not in PIL.__version__:
+        print(f"[INFO] Using Pillow {PIL.__version__}. For faster previews and batch processing, replace it "
+              "with Pillow-SIMD: pip uninstall pillow && pip install pillow-simd")
+
+class _QueueWriter:
+    """File-like object that forwards writes to a queue, used to stream stdout into the UI.
+    
+    print() writes the text and the newline separately, so writes are buffered per thread
+    and only whole lines are queued; lines from worker threads don't run into each other.
+    """
+    def __init__(self, q):
+        self.q = q
+        self._local = threading.local()
+        
+    def write(self, s):
+        buf = getattr(self._local, 'buf', '') + s
+        lines, newline, rest = buf.rpartition('\n')
+        if newline:
+            self.q.put(lines + newline)
+        self._local.buf = rest
+        return len(s)
+    
+    def flush(self):
+        buf = getattr(self._local, 'buf', '')
+        if buf:
+            self.q.put(buf)
+            self._local.buf = ''
+
+
 class LogoStamperGUI:
     def __init__(self, root):
         self.root = root
@@ -36,14 +76,45 @@ class LogoStamperGUI:
         self.openai_api_key = tk.StringVar()
         self.ai_model = tk.StringVar(value="gpt-5-mini")
         self.max_filename_length = tk.IntVar(value=50)
+        self.use_name_cache = tk.BooleanVar(value=True)
         
         # Preview variables
         self.preview_image = None
         self.preview_photo = None
+        self._canvas_image_id = None
         self.full_size_preview = tk.BooleanVar(value=False)
         self.show_preview = tk.BooleanVar(value=False)  # Default to not showing preview
         self.zoom_factor = 1.0
         
+        # Decoded images keyed by (path, mtime, draft size) so slider drags don't re-decode
+        self._img_cache = {}
+        
+        # Logos with opacity already applied, keyed by (path, mtime, opacity)
+        self._logo_alpha_cache = {}
+        
+        # path -> (exists, timestamp), avoids repeated stat calls on slow (network) drives
+        self._stat_cache = {}
+        
+        # ((folder, recursive, mtime), first image) from the last folder scan
+        self._first_image_cache = None
+        
+        # Log lines written by the worker thread, drained periodically on the main thread
+        self._log_q = queue.Queue()
+        
+        # Pending root.after id for a coalesced preview redraw
+        self._preview_after_id = None
+        
+        # Fast (lower quality) resampling while the user is actively zooming
+        self._interactive = False
+        self._finalize_after_id = None
+        
+        # Settings the current preview was rendered with
+        self._last_params = None
+        
+        # Last known canvas size and (canvas_w, canvas_h, img_w, img_h) of the placed preview
+        self._canvas_size = None
+        self._last_geom = None
+        
         self.setup_ui()
         
     def setup_ui(self):
@@ -104,7 +175,7 @@ class LogoStamperGUI:
         
         # Recursive search option
         recursive_check = ttk.Checkbutton(controls_frame, text="Search subfolders recursively", 
-                         variable=self.recursive, command=self.update_preview)
+                         variable=self.recursive, command=self._schedule_preview)
         recursive_check.grid(row=5, column=0, columnspan=3, sticky=tk.W, pady=10)
         
         # Custom save directory option
@@ -141,13 +212,13 @@ class LogoStamperGUI:
         vertical_combo = ttk.Combobox(options_frame, textvariable=self.vertical_pos, 
                                      values=["top", "bottom"], state="readonly", width=15)
         vertical_combo.grid(row=0, column=1, sticky=tk.W, padx=(0, 20))
-        vertical_combo.bind('<<ComboboxSelected>>', lambda e: self.update_preview())
+        vertical_combo.bind('<<ComboboxSelected>>', lambda e: self._schedule_preview())
         
         ttk.Label(options_frame, text="Horizontal Position:").grid(row=0, column=2, sticky=tk.W, padx=(0, 10))
         horizontal_combo = ttk.Combobox(options_frame, textvariable=self.horizontal_pos,
                                        values=["left", "center", "right"], state="readonly", width=15)
         horizontal_combo.grid(row=0, column=3, sticky=tk.W)
-        horizontal_combo.bind('<<ComboboxSelected>>', lambda e: self.update_preview())
+        horizontal_combo.bind('<<ComboboxSelected>>', lambda e: self._schedule_preview())
         
         # Padding
         ttk.Label(options_frame, text="Padding (pixels):").grid(row=1, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
@@ -192,7 +263,7 @@ class LogoStamperGUI:
         ttk.Label(options_frame, text="Filename Suffix:").grid(row=3, column=0, sticky=tk.W, padx=(0, 10), pady=(10, 0))
         suffix_entry = ttk.Entry(options_frame, textvariable=self.suffix, width=20)
         suffix_entry.grid(row=3, column=1, sticky=tk.W, pady=(10, 0), padx=(0, 20))
-        suffix_entry.bind('<KeyRelease>', lambda e: self.update_preview())
+        suffix_entry.bind('<KeyRelease>', lambda e: self._schedule_preview())
         
         # Info label for suffix
         suffix_info = ttk.Label(options_frame, text="(e.g., '_watermarked')", 
@@ -213,6 +284,11 @@ class LogoStamperGUI:
                                       width=30, show="*", state='disabled')
         self.api_key_entry.grid(row=5, column=1, columnspan=2, sticky=tk.W, pady=(5, 0), padx=(0, 20))
         
+        # Reuse names generated in earlier runs; off to regenerate them
+        self.name_cache_check = ttk.Checkbutton(options_frame, text="Reuse cached names",
+                                                variable=self.use_name_cache, state='disabled')
+        self.name_cache_check.grid(row=5, column=3, sticky=tk.W, pady=(5, 0))
+        
         # AI Model selection
         self.model_label = ttk.Label(options_frame, text="AI Model:", state='disabled')
         self.model_label.grid(row=6, column=0, sticky=tk.W, padx=(20, 10), pady=(5, 0))
@@ -232,7 +308,7 @@ class LogoStamperGUI:
         
         # Preview button and show preview checkbox on same row
         preview_button = ttk.Button(options_frame, text="Update Preview", 
-                                   command=self.update_preview)
+                                   command=lambda: self._do_update_preview(force=True))
         preview_button.grid(row=7, column=2, pady=(15, 0), padx=(0, 10))
         
         # Show preview option (in controls frame so it's always visible)
@@ -274,7 +350,7 @@ class LogoStamperGUI:
         # Full size preview option
         full_size_check = ttk.Checkbutton(preview_controls, text="Full size preview", 
                                          variable=self.full_size_preview,
-                                         command=self.update_preview)
+                                         command=self._schedule_preview)
         full_size_check.grid(row=0, column=0)
         
         # Zoom info label
@@ -317,8 +393,8 @@ class LogoStamperGUI:
                 zoom_percent = int(self.zoom_factor * 100)
                 self.zoom_info.configure(text=f"Zoom: {zoom_percent}% (Ctrl+Wheel to zoom)")
                 
-                # Update preview with new zoom
-                self.update_preview()
+                # Render a fast preview now and a full quality one once zooming stops
+                self._zoom_preview()
             else:
                 # Normal scrolling
                 self.preview_canvas.yview_scroll(int(-1*(event.delta/120)), "units")
@@ -339,8 +415,8 @@ class LogoStamperGUI:
                 zoom_percent = int(self.zoom_factor * 100)
                 self.zoom_info.configure(text=f"Zoom: {zoom_percent}% (Ctrl+Wheel to zoom)")
                 
-                # Update preview with new zoom
-                self.update_preview()
+                # Render a fast preview now and a full quality one once zooming stops
+                self._zoom_preview()
             else:
                 # Normal scrolling
                 if event.num == 4:
@@ -399,6 +475,10 @@ class LogoStamperGUI:
         def _end_drag(event):
             self.preview_canvas.configure(cursor='hand2')  # Reset cursor after dragging
         
+        def _on_canvas_configure(event):
+            self._canvas_size = (event.width, event.height)
+        
+        self.preview_canvas.bind("<Configure>", _on_canvas_configure)
         self.preview_canvas.bind("<Button-1>", _start_drag)
         self.preview_canvas.bind("<B1-Motion>", _drag)
         self.preview_canvas.bind("<ButtonRelease-1>", _end_drag)
@@ -412,12 +492,18 @@ class LogoStamperGUI:
         style = ttk.Style()
         style.configure('Accent.TButton', font=('Arial', 10, 'bold'))
         
+        # Start polling for log output from the processing thread
+        self.root.after(50, self._drain_log)
+        
     def browse_folder(self):
         folder = filedialog.askdirectory(title="Select Image Folder")
         if folder:
             self.folder_path.set(folder)
+            self._img_cache.clear()
+            self._last_params = None
+            self._stat_cache.clear()
             self.reset_zoom()  # Reset zoom when changing folder
-            self.update_preview()
+            self._schedule_preview()
             
     def browse_logo(self):
         logo = filedialog.askopenfilename(
@@ -431,13 +517,18 @@ class LogoStamperGUI:
         )
         if logo:
             self.logo_path.set(logo)
+            self._img_cache.clear()
+            self._logo_alpha_cache.clear()
+            self._last_params = None
+            self._stat_cache.clear()
             self.reset_zoom()  # Reset zoom when changing logo
-            self.update_preview()
+            self._schedule_preview()
             
     def browse_save_dir(self):
         save_dir = filedialog.askdirectory(title="Select Save Directory")
         if save_dir:
             self.save_path.set(save_dir)
+            self._stat_cache.clear()
             
     def toggle_save_directory(self):
         if self.use_custom_save.get():
@@ -458,7 +549,7 @@ class LogoStamperGUI:
             # Adjust grid weights to give space to both controls and preview
             self.main_frame.columnconfigure(0, weight=0)  # Controls frame - fixed width
             self.main_frame.columnconfigure(1, weight=1)  # Preview frame - takes remaining space
-            self.update_preview()
+            self._schedule_preview()
         else:
             # Hide the preview frame
             self.preview_frame.grid_remove()
@@ -476,9 +567,9 @@ class LogoStamperGUI:
             self.model_combo.configure(state='readonly')
             self.filename_length_label.configure(state='normal')
             self.filename_length_entry.configure(state='normal')
+            self.name_cache_check.configure(state='normal')
             
             # Load API key from environment if available
-            import os
             env_key = os.getenv('OPENAI_API_KEY')
             if env_key and not self.openai_api_key.get():
                 self.openai_api_key.set(env_key)
@@ -490,29 +581,40 @@ class LogoStamperGUI:
             self.model_combo.configure(state='disabled')
             self.filename_length_label.configure(state='disabled')
             self.filename_length_entry.configure(state='disabled')
+            self.name_cache_check.configure(state='disabled')
     
     def reset_zoom(self):
         """Reset zoom to 100%"""
         self.zoom_factor = 1.0
         self.zoom_info.configure(text="Zoom: 100% (Ctrl+Wheel to zoom)")
-        self.update_preview()
+        self._schedule_preview()
     
     def update_padding_label(self, value):
         """Update the padding label with current value"""
         self.padding_label.configure(text=f"{int(float(value))}")
-        self.update_preview()
+        self._schedule_preview()
     
     def update_scale_label(self, value):
         """Update the scale label with current value"""
         percentage = int(float(value) * 100)
         self.scale_label.configure(text=f"{percentage}%")
-        self.update_preview()
+        self._schedule_preview()
     
     def update_opacity_label(self, value):
         """Update the opacity label with current value"""
         percentage = int(float(value) * 100)
         self.opacity_label.configure(text=f"{percentage}%")
-        self.update_preview()
+        self._schedule_preview()
+    
+    def _exists_cached(self, path, ttl=1.0):
+        """Path.exists() that reuses the result for ttl seconds"""
+        path = str(path)
+        now = time.monotonic()
+        cached = self._stat_cache.get(path)
+        if cached is None or now - cached[1] > ttl:
+            cached = (Path(path).exists(), now)
+            self._stat_cache[path] = cached
+        return cached[0]
     
     def get_first_image(self):
         """Get the first image from the selected folder"""
@@ -521,26 +623,106 @@ class LogoStamperGUI:
         
         try:
             folder_path = Path(self.folder_path.get())
-            if not folder_path.exists():
+            if not self._exists_cached(folder_path):
                 return None
+            
+            # Reuse the last lookup while the folder is unchanged
+            key = (folder_path, self.recursive.get(), folder_path.stat().st_mtime)
+            if self._first_image_cache and self._first_image_cache[0] == key:
+                return self._first_image_cache[1]
                 
-            image_extensions = ('.jpg', '.jpeg', '.png')
+            image_extensions = {'.jpg', '.jpeg', '.png'}
             
-            if self.recursive.get():
-                image_files = [p for p in folder_path.rglob("*") if p.suffix.lower() in image_extensions]
-            else:
-                image_files = [p for p in folder_path.glob("*") if p.suffix.lower() in image_extensions]
+            # Stop at the first match instead of listing the whole tree
+            def walker():
+                if self.recursive.get():
+                    for p in folder_path.rglob("*"):
+                        if p.suffix.lower() in image_extensions:
+                            yield p
+                else:
+                    with os.scandir(folder_path) as it:
+                        for entry in it:
+                            if entry.is_file() and Path(entry.name).suffix.lower() in image_extensions:
+                                yield Path(entry.path)
             
-            if image_files:
-                return image_files[0]
+            first_image = next(walker(), None)
+            self._first_image_cache = (key, first_image)
+            return first_image
                 
         except Exception:
             pass
         
         return None
     
-    def update_preview(self):
+    def _load_image(self, path, draft_size=None):
+        """Load an image as RGB (no alpha) or RGBA, reusing the decoded pixels while the file is unchanged.
+        
+        JPEGs are decoded at reduced scale when draft_size is given. Returns the image
+        together with its size on disk.
+        """
+        key = (path, Path(path).stat().st_mtime, draft_size)
+        cached = self._img_cache.get(key)
+        if cached is None:
+            im = Image.open(path)
+            source_size = im.size
+            if draft_size and im.format == 'JPEG':
+                # Let libjpeg downscale by a power of two while decoding
+                im.draft('RGB', draft_size)
+            im = _to_compositing_mode(im)
+            im.load()
+            cached = (im, source_size)
+            # Keep at most the base image and the logo around
+            while len(self._img_cache) >= 2:
+                self._img_cache.pop(next(iter(self._img_cache)))
+            self._img_cache[key] = cached
+        return cached
+    
+    def _load_logo(self, path, opacity):
+        """Load the logo with its alpha channel pre-scaled by opacity (quantized to 1%)"""
+        opacity = round(opacity, 2)
+        key = (path, Path(path).stat().st_mtime, opacity)
+        logo = self._logo_alpha_cache.pop(key, None)
+        if logo is None:
+            logo, _ = self._load_image(path)
+            if logo.mode != 'RGBA' or opacity < 1.0:
+                # convert() also copies, leaving the cached image untouched
+                logo = logo.convert('RGBA')
+            if opacity < 1.0:
+                alpha = logo.getchannel('A').point(_opacity_lut(opacity))
+                logo.putalpha(alpha)
+            # Least recently used entry is first in insertion order
+            while len(self._logo_alpha_cache) >= 4:
+                self._logo_alpha_cache.pop(next(iter(self._logo_alpha_cache)))
+        self._logo_alpha_cache[key] = logo
+        return logo
+    
+    def _schedule_preview(self, delay=120):
+        """Coalesce rapid preview requests (e.g. slider drags) into a single redraw"""
+        if self._preview_after_id:
+            self.root.after_cancel(self._preview_after_id)
+        self._preview_after_id = self.root.after(delay, self._do_update_preview)
+    
+    def _zoom_preview(self):
+        """Redraw quickly during wheel zooming and schedule a full quality redraw afterwards"""
+        self._interactive = True
+        self._schedule_preview(20)
+        if self._finalize_after_id:
+            self.root.after_cancel(self._finalize_after_id)
+        self._finalize_after_id = self.root.after(200, self._finalize_preview)
+    
+    def _finalize_preview(self):
+        """Re-render the preview with high quality resampling once zooming has settled"""
+        self._finalize_after_id = None
+        self._interactive = False
+        self._do_update_preview()
+    
+    def _do_update_preview(self, force=False):
         """Update the preview image with current settings"""
+        # Drop any pending redraw, this one supersedes it
+        if self._preview_after_id:
+            self.root.after_cancel(self._preview_after_id)
+            self._preview_after_id = None
+        
         try:
             # Check if preview is enabled
             if not self.show_preview.get():
@@ -559,32 +741,50 @@ class LogoStamperGUI:
                 return
             
             # Check if logo exists
-            if not Path(self.logo_path.get()).exists():
+            if not self._exists_cached(self.logo_path.get()):
                 self._show_preview_message("Logo file not found")
                 return
             
-            # Load and process the image
-            im = Image.open(first_image).convert('RGBA')
-            logo = Image.open(self.logo_path.get()).convert('RGBA')
+            # Skip the redraw if nothing visible changed (e.g. a slider moved within the same value)
+            params = (
+                self.vertical_pos.get(), self.horizontal_pos.get(),
+                int(self.padding.get()), round(self.logo_scale.get(), 3), round(self.opacity.get(), 2),
+                self.full_size_preview.get(), round(self.zoom_factor, 3), self._interactive,
+                str(first_image), self.logo_path.get()
+            )
+            if not force and params == self._last_params:
+                return
+            
+            # Load the (cached) source image, a 2x safety margin over the 400px preview
+            # is enough when not showing it at full size
+            draft_size = None if self.full_size_preview.get() else (800, 800)
+            base, (im_width, im_height) = self._load_image(str(first_image), draft_size)
             
             # Get current settings
             vertical_pos = VerticalPosition(self.vertical_pos.get())
             horizontal_pos = HorizontalPosition(self.horizontal_pos.get())
             padding = self.padding.get()
             logo_scale = self.logo_scale.get()
-            opacity = self.opacity.get()
             
-            # Use the same processing function as the main application
-            result_im = _process_logo_on_image(
-                im, logo, vertical_pos, horizontal_pos,
-                padding, logo_scale, opacity
-            )
+            # Opacity is baked into the cached logo, so composite at full opacity
+            logo = self._load_logo(self.logo_path.get(), self.opacity.get())
+            opacity = 1.0
             
-            # Convert to RGB for display (no alpha channel issues)
-            result_im = result_im.convert('RGB')
+            # Use cheap resampling while zooming, a final LANCZOS pass follows
+            resample = Image.BILINEAR if self._interactive else Image.LANCZOS
             
             # Handle preview sizing
             if self.full_size_preview.get():
+                # Use the same processing function as the main application
+                result_im = _process_logo_on_image(
+                    base.copy(), logo, vertical_pos, horizontal_pos,
+                    padding, logo_scale, opacity
+                )
+                
+                # Convert to RGB for display (no alpha channel issues)
+                if result_im.mode != 'RGB':
+                    result_im = result_im.convert('RGB')
+                
                 # For full size, we might need to limit the display size to prevent GUI issues
                 # If image is too large, we'll show it at actual size but with scrollbars
                 im_width, im_height = result_im.size
@@ -595,45 +795,81 @@ class LogoStamperGUI:
                     ratio = min(max_display_size / im_width, max_display_size / im_height)
                     new_width = int(im_width * ratio)
                     new_height = int(im_height * ratio)
-                    result_im = result_im.resize((new_width, new_height), Image.LANCZOS)
+                    result_im.thumbnail((new_width, new_height), resample, reducing_gap=2.0)
                 # If smaller than max_display_size, show at actual size
             else:
-                # Scale down for preview (max 400px on longest side)
-                im_width, im_height = result_im.size
+                # Scale down for preview (max 400px on longest side) before adding the logo,
+                # so compositing happens at display resolution
                 max_size = 400
                 ratio = min(max_size / im_width, max_size / im_height)
                 if ratio < 1:
                     new_width = int(im_width * ratio)
                     new_height = int(im_height * ratio)
-                    result_im = result_im.resize((new_width, new_height), Image.LANCZOS)
+                    im = base.resize((new_width, new_height), resample, reducing_gap=2.0)
+                else:
+                    ratio = 1.0
+                    im = base.copy()
+                
+                # Logo size is relative to image width, only padding needs rescaling
+                result_im = _process_logo_on_image(
+                    im, logo, vertical_pos, horizontal_pos,
+                    int(padding * ratio), logo_scale, opacity
+                )
+                
+                # Convert to RGB for display (no alpha channel issues)
+                if result_im.mode != 'RGB':
+                    result_im = result_im.convert('RGB')
             
             # Apply zoom factor
             if self.zoom_factor != 1.0:
                 current_width, current_height = result_im.size
                 new_width = int(current_width * self.zoom_factor)
                 new_height = int(current_height * self.zoom_factor)
-                result_im = result_im.resize((new_width, new_height), Image.LANCZOS)
-            
-            # Convert to PhotoImage for display
-            self.preview_photo = ImageTk.PhotoImage(result_im)
-            
-            # Clear canvas and display image
-            self.preview_canvas.delete("all")
-            canvas_width = self.preview_canvas.winfo_width()
-            canvas_height = self.preview_canvas.winfo_height()
+                if self.zoom_factor > 1.0:
+                    # Upscaling an already small preview, bilinear is plenty on screen
+                    result_im = result_im.resize((new_width, new_height), Image.BILINEAR)
+                else:
+                    result_im.thumbnail((new_width, new_height), resample, reducing_gap=2.0)
             
-            # Center the image on the canvas
+            # Canvas size is tracked through <Configure> events, query it only before the first one
+            if self._canvas_size is None:
+                self._canvas_size = (self.preview_canvas.winfo_width(), self.preview_canvas.winfo_height())
+            canvas_width, canvas_height = self._canvas_size
             img_width, img_height = result_im.size
-            x = max(0, (canvas_width - img_width) // 2) if canvas_width > img_width else 0
-            y = max(0, (canvas_height - img_height) // 2) if canvas_height > img_height else 0
+            geom = (canvas_width, canvas_height, img_width, img_height)
+            
+            if (self._canvas_image_id is not None and self.preview_photo is not None
+                    and (self.preview_photo.width(), self.preview_photo.height()) == result_im.size):
+                # Same size as what is shown: update the pixels of the existing Tk image in place.
+                # ImageTk blits the RGB buffer straight into Tk, which beats tk.PhotoImage.put()
+                # (that only accepts color strings or encoded image data)
+                self.preview_photo.paste(result_im)
+            else:
+                # Convert to PhotoImage for display
+                self.preview_photo = ImageTk.PhotoImage(result_im)
+                
+                # Clear canvas and display image
+                self.preview_canvas.delete("all")
+                self._canvas_image_id = self.preview_canvas.create_image(
+                    0, 0, anchor=tk.NW, image=self.preview_photo
+                )
+                self._last_geom = None
             
-            self.preview_canvas.create_image(x, y, anchor=tk.NW, image=self.preview_photo)
+            # Placement and scroll region only change with the canvas or image size
+            if geom != self._last_geom:
+                # Center the image on the canvas
+                x = max(0, (canvas_width - img_width) // 2) if canvas_width > img_width else 0
+                y = max(0, (canvas_height - img_height) // 2) if canvas_height > img_height else 0
+                self.preview_canvas.coords(self._canvas_image_id, x, y)
+                
+                # Always set scroll region to enable dragging, even for small images
+                # Use the larger of canvas size or image size for each dimension
+                scroll_width = max(img_width, canvas_width or 1)
+                scroll_height = max(img_height, canvas_height or 1)
+                self.preview_canvas.configure(scrollregion=(0, 0, scroll_width, scroll_height))
+                self._last_geom = geom
             
-            # Always set scroll region to enable dragging, even for small images
-            # Use the larger of canvas size or image size for each dimension
-            scroll_width = max(img_width, canvas_width or 1)
-            scroll_height = max(img_height, canvas_height or 1)
-            self.preview_canvas.configure(scrollregion=(0, 0, scroll_width, scroll_height))
+            self._last_params = params
             
         except Exception as e:
             self._show_preview_message(f"Preview error: {str(e)}")
@@ -642,6 +878,9 @@ class LogoStamperGUI:
     def _show_preview_message(self, message):
         """Show a text message in the preview area"""
         self.preview_canvas.delete("all")
+        self._canvas_image_id = None
+        self._last_params = None
+        self._last_geom = None
         canvas_width = self.preview_canvas.winfo_width() or 400
         canvas_height = self.preview_canvas.winfo_height() or 300
         self.preview_canvas.create_text(
@@ -654,7 +893,23 @@ class LogoStamperGUI:
         """Add text to the output area"""
         self.output_text.insert(tk.END, text + "\n")
         self.output_text.see(tk.END)
-        self.root.update_idletasks()
+        
+    def _flush_log(self):
+        """Move everything currently queued by the processing thread into the output area"""
+        chunks = []
+        try:
+            while True:
+                chunks.append(self._log_q.get_nowait())
+        except queue.Empty:
+            pass
+        if chunks:
+            self.output_text.insert(tk.END, "".join(chunks))
+            self.output_text.see(tk.END)
+            
+    def _drain_log(self):
+        """Periodically flush queued log output while the app is running"""
+        self._flush_log()
+        self.root.after(50, self._drain_log)
         
     def clear_output(self):
         """Clear the output text area"""
@@ -670,11 +925,11 @@ class LogoStamperGUI:
             messagebox.showerror("Error", "Please select a logo file.")
             return False
             
-        if not Path(self.folder_path.get()).exists():
+        if not self._exists_cached(self.folder_path.get()):
             messagebox.showerror("Error", "Image folder does not exist.")
             return False
             
-        if not Path(self.logo_path.get()).exists():
+        if not self._exists_cached(self.logo_path.get()):
             messagebox.showerror("Error", "Logo file does not exist.")
             return False
             
@@ -718,9 +973,14 @@ class LogoStamperGUI:
     def _process_images_thread(self):
         """The actual processing logic that runs in a separate thread"""
         try:
-            # Redirect stdout to capture print statements
+            # Redirect stdout so print statements stream into the output area
             old_stdout = sys.stdout
-            sys.stdout = output_capture = io.StringIO()
+            sys.stdout = _QueueWriter(self._log_q)
+            # Log records from the processing modules go to the same place
+            log_handler = logging.StreamHandler(sys.stdout)
+            log_handler.setFormatter(logging.Formatter("[%(levelname)s] %(message)s"))
+            for name in ('overlay_logo', 'image_analyzer'):
+                logging.getLogger(name).addHandler(log_handler)
             
             # Determine save directory
             save_dir = None
@@ -741,6 +1001,7 @@ class LogoStamperGUI:
             openai_api_key = self.openai_api_key.get() if use_ai_naming else None
             ai_model = self.ai_model.get()
             max_filename_length = self.max_filename_length.get()
+            name_cache = self.use_name_cache.get()
                 
             # Process the images
             stamp_folder(
@@ -757,34 +1018,41 @@ class LogoStamperGUI:
                 use_ai_naming=use_ai_naming,
                 openai_api_key=openai_api_key,
                 ai_model=ai_model,
-                max_filename_length=max_filename_length
+                max_filename_length=max_filename_length,
+                name_cache=name_cache,
+                # AI naming is network bound and uses the library default, otherwise leave a core for the UI
+                max_workers=None if use_ai_naming else max(1, (os.cpu_count() or 1) - 1)
             )
             
-            # Get the captured output
-            output = output_capture.getvalue()
-            
             # Restore stdout
+            sys.stdout.flush()
             sys.stdout = old_stdout
+            self._remove_log_handler(log_handler)
             
             # Update UI in main thread
-            self.root.after(0, self._processing_complete, output, True)
+            self.root.after(0, self._processing_complete, None, True)
             
         except Exception as e:
             # Restore stdout
+            sys.stdout.flush()
             sys.stdout = old_stdout
+            self._remove_log_handler(log_handler)
             
             # Update UI in main thread with error
             self.root.after(0, self._processing_complete, str(e), False)
             
+    def _remove_log_handler(self, handler):
+        for name in ('overlay_logo', 'image_analyzer'):
+            logging.getLogger(name).removeHandler(handler)
+            
     def _processing_complete(self, output, success):
         """Called when processing is complete"""
         # Stop progress and re-enable button
         self.progress.stop()
         self.process_button.configure(state='normal')
         
-        # Show output
-        if output:
-            self.log_output(output)
+        # Show any output that hasn't been drained yet
+        self._flush_log()
             
         # Show completion message
         if success:
@@ -796,6 +1064,7 @@ class LogoStamperGUI:
 
 
 def main():
+    check_pillow_simd()
     root = tk.Tk()
     app = LogoStamperGUI(root)
     root.mainloop()
@@ -3,75 +3,332 @@ Image analysis module using OpenAI API to generate descriptive filenames.
 """
 
 import base64
+import hashlib
 import io
+import json
+import logging
 import re
+import sqlite3
 from pathlib import Path
 from typing import Optional
 from PIL import Image
-from openai import OpenAI
+import httpx
+import openai
+from openai import OpenAI, DefaultHttpxClient
+import threading
 import time
 import random
 
-class SimpleLimiter:
-    """Fixed spacing between calls (e.g., 2 req/sec = 0.5s spacing)."""
-    def __init__(self, min_interval_s: float = 0.5):
-        self.min_interval_s = max(0.0, min_interval_s)
-        self._last = 0.0
-
-    def wait(self):
-        now = time.time()
-        wait_s = max(0.0, self._last + self.min_interval_s - now)
-        if wait_s:
-            time.sleep(wait_s)
-        self._last = time.time()
-
-def simple_retry(call, *, max_retries: int = 3):
-    """Retry on common transient failures with tiny exponential backoff."""
+try:
+    # Optional: enables HTTP/2 in httpx
+    import h2  # noqa: F401
+    _HTTP2_AVAILABLE = True
+except ImportError:
+    _HTTP2_AVAILABLE = False
+
+try:
+    # Optional: needed to hand images to the faster JPEG encoders below
+    import numpy as np
+except ImportError:
+    np = None
+
+simplejpeg = cv2 = None
+if np is not None:
+    try:
+        # Optional: libjpeg-turbo based encoder, considerably faster than Pillow's
+        import simplejpeg
+    except ImportError:
+        pass
+
+    try:
+        # Optional: OpenCV's SIMD JPEG encoder, used when simplejpeg is unavailable
+        import cv2
+    except ImportError:
+        pass
+
+
+log = logging.getLogger(__name__)
+
+# Longest side of the image sent to the API (OpenAI has size limits)
+ANALYSIS_MAX_SIZE = 1024
+
+# JPEGs smaller than this (and within ANALYSIS_MAX_SIZE) are sent without re-encoding
+RAW_JPEG_MAX_BYTES = 2 * 1024 * 1024
+
+# On-disk cache of generated names, so re-runs don't pay for the same image twice
+NAME_CACHE_PATH = Path.home() / '.cache' / 'logo-paster' / 'ai_names.sqlite'
+
+# Filename cleanup patterns, compiled once
+_DISALLOWED_CHARS = re.compile(r'[^a-zA-Z0-9_-]+')
+_SEPARATOR_RUNS = re.compile(r'[_-]+')
+
+# Markdown code fence around a JSON reply, e.g. ```json [...] ```
+_CODE_FENCE = re.compile(r'^```[a-zA-Z]*\s*|\s*```$')
+
+# Structured output for batch requests, so the reply is plain JSON
+_FILENAMES_FORMAT = {
+    "type": "json_schema",
+    "name": "filenames",
+    "schema": {
+        "type": "object",
+        "properties": {"filenames": {"type": "array", "items": {"type": "string"}}},
+        "required": ["filenames"],
+        "additionalProperties": False,
+    },
+    "strict": True,
+}
+
+
+def _encode_jpeg(image: Image.Image, quality: int = 85) -> bytes | memoryview:
+    """Encode an RGB image as JPEG with the fastest available encoder."""
+    if simplejpeg is not None:
+        return simplejpeg.encode_jpeg(np.asarray(image), quality=quality, colorspace='RGB')
+    if cv2 is not None:
+        bgr = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2BGR)
+        return cv2.imencode('.jpg', bgr, [cv2.IMWRITE_JPEG_QUALITY, quality])[1].tobytes()
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=quality)
+    # Zero-copy view of the buffer, base64 can read it directly
+    return buffered.getbuffer()
+
+def _has_metadata(image: Image.Image) -> bool:
+    """Whether an opened JPEG carries EXIF, XMP, IPTC, comments or other APPn segments
+    (e.g. GPS position or camera serial) that a re-encode would strip."""
+    # APP0 is the JFIF header and APP2 the color profile, neither identifies anyone
+    return ('comment' in image.info
+            or any(marker not in ('APP0', 'APP2') for marker, _ in getattr(image, 'applist', ())))
+
+class TokenBucket:
+    """Token bucket rate limiter: bursts of up to `capacity` calls, refilled at `rate_per_s`.
+    Safe to share between threads."""
+    def __init__(self, rate_per_s: float = 4.0, capacity: float = 8):
+        self.rate = max(1e-6, rate_per_s)
+        self.cap = max(1.0, capacity)
+        self.tokens = self.cap
+        self.ts = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.cap, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                sleep_s = (1 - self.tokens) / self.rate
+            # Sleep without holding the lock so other callers can refill/penalize
+            time.sleep(sleep_s)
+
+    def penalize(self, delay_s: float):
+        """Hold back all callers for about delay_s (e.g. a Retry-After from a 429).
+        
+        A deadline, not a cost: several callers reporting the same Retry-After don't add up."""
+        with self.lock:
+            self._refill()
+            self.tokens = min(self.tokens, -delay_s * self.rate)
+
+# OpenAI errors that are worth retrying
+_TRANSIENT = (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError)
+
+def _retry_info(e: Exception) -> tuple[bool, Optional[float]]:
+    """Whether a failed call is worth retrying, and the server's Retry-After in seconds if given."""
+    # Try to detect rate limit / transient errors
+    if isinstance(e, _TRANSIENT):
+        transient = True
+    elif isinstance(e, openai.APIError):
+        transient = False
+    else:
+        status = getattr(e, "status_code", None) or getattr(e, "http_status", None)
+        transient = status in (429, 500, 502, 503, 504) or status is None
+
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or getattr(e, "headers", None) or {}
+    try:
+        # httpx headers are case-insensitive, plain dicts are not
+        ra = headers.get("Retry-After") or headers.get("retry-after")
+        retry_after = float(ra) if ra is not None else None
+    except Exception:
+        retry_after = None
+    return transient, retry_after
+
+def simple_retry(call, *, max_retries: int = 3, limiter: Optional[TokenBucket] = None):
+    """Retry on common transient failures with tiny exponential backoff.
+    
+    If a limiter is given, a server-provided Retry-After is applied to the limiter so
+    every caller sharing it backs off, not just the one that got the error.
+    """
     for attempt in range(max_retries):
         try:
             return call()
         except Exception as e:
-            # Try to detect rate limit / transient errors
-            status = getattr(e, "status_code", None) or getattr(e, "http_status", None)
-            retry_after = None
-            headers = getattr(e, "headers", None) or getattr(e, "response_headers", None) or {}
-            if isinstance(headers, dict):
-                ra = headers.get("Retry-After") or headers.get("retry-after")
-                try:
-                    retry_after = float(ra) if ra is not None else None
-                except Exception:
-                    retry_after = None
-
-            transient = status in (429, 500, 502, 503, 504) or status is None
+            # Errors are only inspected once a call failed
+            transient, retry_after = _retry_info(e)
             if attempt == max_retries - 1 or not transient:
                 raise
 
+            if retry_after is not None and limiter is not None:
+                # the call waits on the limiter before retrying
+                limiter.penalize(retry_after)
+                continue
+
             # sleep: prefer Retry-After, else tiny backoff with jitter
             base = retry_after if retry_after is not None else (1.0 * (2 ** attempt))
             time.sleep(base * (0.8 + 0.4 * random.random()))
 
+class NameCache:
+    """Generated filenames keyed by image content, stored in SQLite. Safe to share between threads."""
+    def __init__(self, path: str | Path = NAME_CACHE_PATH):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("CREATE TABLE IF NOT EXISTS names (hash TEXT PRIMARY KEY, name TEXT)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def key(image_path: str | Path, model: str, max_filename_length: int) -> str:
+        """Hash of the first 64 KB and the size of the file; enough to tell images apart."""
+        with open(image_path, 'rb') as f:
+            h = hashlib.blake2b(f.read(65536), digest_size=16)
+            h.update(f"{f.seek(0, io.SEEK_END)}:{model}:{max_filename_length}".encode())
+        return h.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT name FROM names WHERE hash = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, name: str):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO names VALUES (?, ?)", (key, name))
+            self.conn.commit()
+
 class ImageAnalyzer:
     """Analyzes images using OpenAI API to generate descriptive filenames."""
     
-    def __init__(self, api_key: str, model: str = "gpt-5-mini", min_interval_s: float = 0.25):
+    def __init__(self, api_key: str, model: str = "gpt-5-mini", rate_per_s: float = 4.0, burst: int = 8,
+                 concurrency: int = 16, cache_path: Optional[str | Path] = NAME_CACHE_PATH,
+                 max_retries: int = 3):
         """
         Initialize the ImageAnalyzer.
         
         Args:
             api_key: OpenAI API key
             model: OpenAI model to use for image analysis
+            rate_per_s: Average number of API requests per second
+            burst: Number of requests that may be sent at once before throttling
+            concurrency: Number of threads sharing this analyzer, sizes the connection pool
+            cache_path: SQLite file caching generated names per image, None to disable
+            max_retries: Attempts per API request on transient errors, 1 to disable retries
         """
-        self.client = OpenAI(api_key=api_key)
+        # One pooled client shared by all threads so connections (and TLS sessions) are
+        # reused; HTTP/2 multiplexes the requests over one connection when h2 is installed
+        http_client = DefaultHttpxClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+            timeout=httpx.Timeout(60.0, connect=10.0),
+        )
+        self.client = OpenAI(api_key=api_key, http_client=http_client)
         self.model = model
-        self._limiter = SimpleLimiter(min_interval_s=min_interval_s)  
+        self._limiter = TokenBucket(rate_per_s=rate_per_s, capacity=burst)
+        self._max_retries = max_retries
+        self._cache = None
+        if cache_path is not None:
+            try:
+                self._cache = NameCache(cache_path)
+            except (OSError, sqlite3.Error) as e:
+                print(f"[WARNING] Filename cache disabled: {e}")
+
+    def _cache_key(self, image_path: str | Path, max_filename_length: int) -> Optional[str]:
+        if self._cache is None:
+            return None
+        try:
+            return NameCache.key(image_path, self.model, max_filename_length)
+        except OSError:
+            return None
+
+    def _cache_get(self, key: Optional[str]) -> Optional[str]:
+        if key is None:
+            return None
+        try:
+            return self._cache.get(key)
+        except sqlite3.Error:
+            return None
+
+    def _cache_put(self, key: Optional[str], name: Optional[str]):
+        if key is None or name is None:
+            return
+        try:
+            self._cache.put(key, name)
+        except sqlite3.Error as e:
+            print(f"[WARNING] Failed to cache filename: {e}")
 
     def _call_responses(self, **kwargs):
+        if self._max_retries <= 1:
+            self._limiter.acquire()
+            return self.client.responses.create(**kwargs)
+        
         def _do():
-            self._limiter.wait()
+            self._limiter.acquire()
             return self.client.responses.create(**kwargs)
-        return simple_retry(_do)
+        return simple_retry(_do, max_retries=self._max_retries, limiter=self._limiter)
 
         
+    def _encode_for_api(self, image: Image.Image) -> str:
+        """Convert an image to RGB, downscale it to the API size limit and return it as base64 JPEG."""
+        max_size = ANALYSIS_MAX_SIZE
+        
+        # Convert to RGB if necessary, transparent areas become white
+        if image.mode in ('RGBA', 'LA'):
+            if image.mode == 'LA':
+                image = image.convert('RGBA')
+            background = Image.new('RGBA', image.size, (255, 255, 255, 255))
+            image = Image.alpha_composite(background, image).convert('RGB')
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        
+        # Resize image if it's too large (OpenAI has size limits). Images opened from a file
+        # are already downscaled; others belong to the caller, so no in-place thumbnail()
+        if max(image.size) > max_size:
+            ratio = max_size / max(image.size)
+            new_size = tuple(int(dim * ratio) for dim in image.size)
+            image = image.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=2.0)
+        
+        # Convert to base64
+        return base64.b64encode(_encode_jpeg(image, quality=85)).decode('ascii')
+    
+    def _open_for_analysis(self, image_path: str | Path) -> Image.Image:
+        """Open an image file already downscaled to the analysis size."""
+        image = Image.open(image_path)
+        # In place and a no-op if the image fits; JPEGs are drafted so libjpeg decodes
+        # them at a reduced scale
+        image.thumbnail((ANALYSIS_MAX_SIZE, ANALYSIS_MAX_SIZE), Image.Resampling.LANCZOS)
+        return image
+    
+    def _load_for_api(self, image_path: str | Path) -> str:
+        """Return the image file as base64 JPEG ready for the API.
+        
+        Small JPEGs that already fit the size limit and carry no metadata are sent as
+        they are, skipping the decode and re-encode.
+        """
+        image_path = Path(image_path)
+        if (image_path.suffix.lower() in ('.jpg', '.jpeg')
+                and image_path.stat().st_size < RAW_JPEG_MAX_BYTES):
+            # Opening only reads the header, the pixels are not decoded
+            with Image.open(image_path) as image:
+                fits = (image.format == 'JPEG' and image.mode in ('RGB', 'L')
+                        and max(image.size) <= ANALYSIS_MAX_SIZE
+                        and not _has_metadata(image))
+            if fits:
+                return base64.b64encode(image_path.read_bytes()).decode('ascii')
+        
+        return self._encode_for_api(self._open_for_analysis(image_path))
+    
     def analyze_image(self, image_path: str | Path, max_filename_length: int = 50) -> Optional[str]:
         """
         Analyze an image and generate a descriptive filename.
@@ -83,33 +340,55 @@ class ImageAnalyzer:
         Returns:
             Generated filename (without extension) or None if analysis fails
         """
+        key = self._cache_key(image_path, max_filename_length)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
         try:
-            # Load and prepare image
-            image = Image.open(image_path)
-            
-            # Convert to RGB if necessary
-            if image.mode in ('RGBA', 'LA'):
-                background = Image.new('RGB', image.size, (255, 255, 255))
-                if image.mode == 'RGBA':
-                    background.paste(image, mask=image.split()[-1])
-                else:
-                    background.paste(image)
-                image = background
-            elif image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Resize image if it's too large (OpenAI has size limits)
-            max_size = 1024
-            if max(image.size) > max_size:
-                ratio = max_size / max(image.size)
-                new_size = tuple(int(dim * ratio) for dim in image.size)
-                image = image.resize(new_size, Image.Resampling.LANCZOS)
-            
-            # Convert to base64
-            buffered = io.BytesIO()
-            image.save(buffered, format="JPEG", quality=85)
-            img_base64 = base64.b64encode(buffered.getvalue()).decode()
+            # Load image
+            img_base64 = self._load_for_api(image_path)
+        except Exception as e:
+            print(f"[WARNING] Failed to analyze image {image_path}: {e}")
+            return None
+        
+        orig_filename = Path(image_path).stem
+        return self._analyze_base64(img_base64, orig_filename, max_filename_length, key)
+    
+    def analyze_pil_image(self, image: Image.Image, orig_filename: str, max_filename_length: int = 50,
+                          image_path: Optional[str | Path] = None) -> Optional[str]:
+        """
+        Analyze an already opened image and generate a descriptive filename.
+        
+        Use this when the image is decoded anyway (e.g. for stamping) to avoid opening
+        the file a second time. The image itself is not modified.
+        
+        Args:
+            image: Image to analyze
+            orig_filename: Original filename (without extension), used as fallback
+            max_filename_length: Maximum length for the generated filename
+            image_path: File the image was opened from, used to look up cached names
             
+        Returns:
+            Generated filename (without extension) or None if analysis fails
+        """
+        key = self._cache_key(image_path, max_filename_length) if image_path is not None else None
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+        
+        try:
+            img_base64 = self._encode_for_api(image)
+        except Exception as e:
+            print(f"[WARNING] Failed to analyze image {orig_filename}: {e}")
+            return None
+        
+        return self._analyze_base64(img_base64, orig_filename, max_filename_length, key)
+    
+    def _analyze_base64(self, img_base64: str, orig_filename: str, max_filename_length: int,
+                        cache_key: Optional[str] = None) -> Optional[str]:
+        """Request a filename for a base64 encoded JPEG and cache it under cache_key."""
+        try:
             # Create the prompt
             prompt = (
                 f"Analyze this image and generate a descriptive filename (maximum {max_filename_length} characters). "
@@ -143,31 +422,120 @@ class ImageAnalyzer:
                 reasoning={"effort": "low"},
                 text={"verbosity": "low"}
             )
-            print(response)
+            log.debug("response: %s", response)
             
             # Extract and clean the filename
             generated_name = (getattr(response, "output_text", "") or "").strip()
-            orig_filename = Path(image_path).name.split('.')[0]
-            cleaned_name = self._clean_filename(generated_name, max_filename_length, orig_filename)
-            print("generated name: ", generated_name)
-            print("cleaned name: ", cleaned_name)
+            cleaned_name, fell_back = self._clean_filename(generated_name, max_filename_length, orig_filename)
+            log.debug("generated name: %s", generated_name)
+            log.debug("cleaned name: %s", cleaned_name)
             
+            # The original name is no answer from the AI, ask again next time
+            if not fell_back:
+                self._cache_put(cache_key, cleaned_name)
             return cleaned_name
             
         except Exception as e:
-            print(f"[WARNING] Failed to analyze image {image_path}: {e}")
+            print(f"[WARNING] Failed to analyze image {orig_filename}: {e}")
             return None
     
-    def _clean_filename(self, filename: str, max_length: int, orig_filename: str) -> str:
+    def analyze_batch(self, image_paths: list[str | Path], max_filename_length: int = 50, k: int = 8) -> list[Optional[str]]:
+        """
+        Generate descriptive filenames for several images, sending k images per API call.
+        
+        Args:
+            image_paths: Paths to the image files
+            max_filename_length: Maximum length for the generated filenames
+            k: Number of images per request
+            
+        Returns:
+            Generated filenames (without extension) in input order, None where analysis failed
+        """
+        keys = [self._cache_key(p, max_filename_length) for p in image_paths]
+        names = [self._cache_get(key) for key in keys]
+        
+        # Only images without a cached name go to the API
+        missing = [i for i, name in enumerate(names) if name is None]
+        for start in range(0, len(missing), k):
+            group = missing[start:start + k]
+            group_names = self._analyze_group([image_paths[i] for i in group], max_filename_length,
+                                              [keys[i] for i in group])
+            for i, name in zip(group, group_names):
+                names[i] = name
+        return names
+    
+    def _analyze_group(self, image_paths: list[str | Path], max_filename_length: int,
+                       cache_keys: Optional[list[Optional[str]]] = None) -> list[Optional[str]]:
+        """Analyze a group of images with a single API call, caching the names under cache_keys."""
+        names = [None] * len(image_paths)
+        
+        # An unreadable image only drops out itself, the others still share the request
+        loaded = []
+        for i, p in enumerate(image_paths):
+            try:
+                loaded.append((i, self._load_for_api(p)))
+            except Exception as e:
+                print(f"[WARNING] Failed to analyze image {p}: {e}")
+        if not loaded:
+            return names
+        
+        n = len(loaded)
+        try:
+            prompt = (
+                f"Analyze each of the {n} provided images and create a concise, descriptive filename for each "
+                f"(maximum {max_filename_length} characters). "
+                "Each filename should: "
+                "- Focus on the main subject, setting, or key visual elements. "
+                "- Use only letters, numbers, hyphens, and underscores "
+                "- Exclude file extensions "
+                "- Be as informative as possible within the character limit. "
+                f"Return {n} filenames, one per image, in the order the images were given. "
+                "Example: {\"filenames\": [\"modern_kitchen_white_cabinets\", \"sunset_mountain_landscape\"]}"
+            )
+            content = [{"type": "input_text", "text": prompt}]
+            content += [
+                {"type": "input_image", "image_url": f"data:image/jpeg;base64,{img_base64}"}
+                for _, img_base64 in loaded
+            ]
+            
+            # Make API call
+            response = self._call_responses(
+                model=self.model,
+                input=[{"role": "user", "content": content}],
+                max_output_tokens=500 + 100 * n,
+                reasoning={"effort": "low"},
+                text={"verbosity": "low", "format": _FILENAMES_FORMAT}
+            )
+            
+            # Tolerate a fenced reply in case the model ignores the format
+            reply = _CODE_FENCE.sub('', (getattr(response, "output_text", "") or "").strip())
+            generated_names = json.loads(reply)
+            if isinstance(generated_names, dict):
+                generated_names = generated_names.get("filenames")
+            if not isinstance(generated_names, list) or len(generated_names) != n:
+                raise ValueError(f"expected a JSON array of {n} filenames, got: {generated_names!r}")
+            
+            for (i, _), name in zip(loaded, generated_names):
+                if isinstance(name, str):
+                    names[i], fell_back = self._clean_filename(name, max_filename_length, Path(image_paths[i]).stem)
+                    if cache_keys and not fell_back:
+                        self._cache_put(cache_keys[i], names[i])
+            
+        except Exception as e:
+            print(f"[WARNING] Failed to analyze images {', '.join(Path(image_paths[i]).name for i, _ in loaded)}: {e}")
+        return names
+    
+    def _clean_filename(self, filename: str, max_length: int, orig_filename: str) -> tuple[str, bool]:
         """
         Clean and validate the generated filename.
         
         Args:
             filename: Raw filename from API
             max_length: Maximum allowed length
+            orig_filename: Used instead when too little of the generated filename is left
             
         Returns:
-            Cleaned filename
+            Cleaned filename and whether it fell back to orig_filename
         """
         # Remove any quotes or extra formatting
         filename = filename.strip().strip('"').strip("'")
@@ -176,10 +544,10 @@ class ImageAnalyzer:
         filename = filename.replace(' ', '_')
         
         # Remove any characters that aren't alphanumeric, hyphens, or underscores
-        filename = re.sub(r'[^a-zA-Z0-9_-]', '', filename)
+        filename = _DISALLOWED_CHARS.sub('', filename)
         
         # Remove multiple consecutive underscores/hyphens
-        filename = re.sub(r'[_-]+', '_', filename)
+        filename = _SEPARATOR_RUNS.sub('_', filename)
         
         # Ensure it doesn't start or end with underscore/hyphen
         filename = filename.strip('_-')
@@ -190,9 +558,9 @@ class ImageAnalyzer:
         
         # Fallback if filename is empty or too short
         if len(filename) < 3:
-            filename = orig_filename
+            return orig_filename, True
         
-        return filename
+        return filename, False
 
 
 def test_analyzer():
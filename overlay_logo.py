@@ -1,9 +1,16 @@
 import argparse
+import functools
+import itertools
+import logging
+import os
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from PIL import Image
 from enum import Enum
 from typing import Tuple, Optional
-from image_analyzer import ImageAnalyzer
+from image_analyzer import ImageAnalyzer, NAME_CACHE_PATH
 
 class VerticalPosition(Enum):
     TOP = "top"
@@ -14,6 +21,15 @@ class HorizontalPosition(Enum):
     CENTER = "center"
     RIGHT = "right"
 
+log = logging.getLogger(__name__)
+
+# Default number of parallel workers when AI naming is on; the work is then bound by
+# OpenAI round-trips rather than CPU
+AI_NAMING_WORKERS = 8
+
+# Logos registered for the scaled-logo cache, by id(); keeps them alive so ids stay valid
+_logos: dict[int, Image.Image] = {}
+
 def stamp_folder(
     im_dir: str | Path, 
     logo_path: str | Path, 
@@ -28,27 +44,44 @@ def stamp_folder(
     use_ai_naming: bool = False,
     openai_api_key: Optional[str] = None,
     ai_model: str = "gpt-5-mini",
-    max_filename_length: int = 50
+    max_filename_length: int = 50,
+    max_workers: Optional[int] = None,
+    ai_batch_size: int = 8,
+    jpeg_quality: int = 85,
+    name_cache: bool = True
 ) -> None:
     
     # Convert to Path objects
     im_dir = Path(im_dir)
     logo_path = Path(logo_path)
     
-    image_extensions = ('.jpg', '.jpeg', '.png')
+    image_extensions = frozenset(('.jpg', '.jpeg', '.png'))
     
-    if recursive:
-        im_paths = [p for p in im_dir.rglob("*") if p.suffix.lower() in image_extensions]
-    else:
-        im_paths = [p for p in im_dir.glob("*") if p.suffix.lower() in image_extensions]
+    # One pattern per extension so other files are never looked at
+    glob = im_dir.rglob if recursive else im_dir.glob
+    im_paths = list(itertools.chain.from_iterable(
+        glob(f"*{ext}", case_sensitive=False) for ext in sorted(image_extensions)
+    ))
     
     # Check for duplicate filenames
-    filename_dict = {}
-    for path in im_paths:
-        if path.name in filename_dict:
-            raise ValueError(f"Duplicate filename detected: {path.name}\n  - {filename_dict[path.name]}\n  - {path}\nAn output directory from a previous run could be the cause. Either delete it or disable recursive image search.")
-        else:
-            filename_dict[path.name] = path
+    name_counts = Counter(path.name for path in im_paths)
+    duplicate = next((name for name, count in name_counts.items() if count > 1), None)
+    if duplicate:
+        first, second = [path for path in im_paths if path.name == duplicate][:2]
+        raise ValueError(f"Duplicate filename detected: {duplicate}\n  - {first}\n  - {second}\nAn output directory from a previous run could be the cause. Either delete it or disable recursive image search.")
+    
+    # Open the logo once for the whole batch
+    try:
+        logo = Image.open(logo_path).convert('RGBA')
+    except Exception as e:
+        print(f"[ERROR] Logo could not be opened: {e}")
+        return
+    
+    # Images are independent and Pillow releases the GIL while decoding,
+    # compositing and encoding (as does the OpenAI client while waiting on the
+    # network), so they are processed on a thread pool
+    if max_workers is None:
+        max_workers = AI_NAMING_WORKERS if use_ai_naming else (os.cpu_count() or 1)
     
     # Initialize AI analyzer if needed
     analyzer = None
@@ -56,7 +89,8 @@ def stamp_folder(
         if not openai_api_key:
             raise ValueError("OpenAI API key is required when use_ai_naming is True")
         try:
-            analyzer = ImageAnalyzer(openai_api_key, ai_model)
+            analyzer = ImageAnalyzer(openai_api_key, ai_model, concurrency=max_workers,
+                                     cache_path=NAME_CACHE_PATH if name_cache else None)
             print(f"[INFO] AI naming enabled using model: {ai_model}")
         except Exception as e:
             print(f"[ERROR] Failed to initialize AI analyzer: {e}")
@@ -73,28 +107,93 @@ def stamp_folder(
     else:
         Path(save_dir).mkdir(exist_ok=True)
         
-    for im_path in im_paths:
-        try:
-            _add_logo_single(
-                im_path, 
-                logo_path, 
-                save_dir, 
-                vertical_pos, 
-                horizontal_pos, 
-                padding, 
-                logo_scale, 
-                opacity,
-                suffix,
-                analyzer,
-                max_filename_length
-            )
-        except ValueError as e:
-            print(e)
-            break            
+    # Images of the same size share one prepared logo
+    _logos[id(logo)] = logo
+    encoder = _Encoder(max_workers)
+    try:
+        # With AI naming, a group of images shares one API request
+        group_size = max(1, ai_batch_size) if analyzer else 1
+        groups = [im_paths[i:i + group_size] for i in range(0, len(im_paths), group_size)]
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    _add_logo_group,
+                    group, 
+                    logo, 
+                    save_dir, 
+                    vertical_pos, 
+                    horizontal_pos, 
+                    padding, 
+                    logo_scale, 
+                    opacity,
+                    suffix,
+                    analyzer,
+                    max_filename_length,
+                    encoder,
+                    jpeg_quality
+                )
+                for group in groups
+            ]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except ValueError as e:
+                    print(e)
+                    executor.shutdown(cancel_futures=True)
+                    break
+    finally:
+        _prepared_logo.cache_clear()
+        del _logos[id(logo)]
+        encoder.wait()
+
+def _add_logo_group(
+    im_paths: list[Path], 
+    logo: Image.Image, 
+    save_dir: str | Path,
+    vertical_pos: VerticalPosition = VerticalPosition.BOTTOM,
+    horizontal_pos: HorizontalPosition = HorizontalPosition.CENTER,
+    padding: int = 10,
+    logo_scale: float = 0.2,
+    opacity: float = 1.0,
+    suffix: str = "",
+    analyzer: Optional[ImageAnalyzer] = None,
+    max_filename_length: int = 50,
+    encoder: Optional["_Encoder"] = None,
+    jpeg_quality: int = 85
+) -> None:
+    """Stamp a group of images, naming them with a single AI request when there are several."""
+    
+    ai_filenames = [None] * len(im_paths)
+    # The batch request reads the files itself, so each image is decoded twice: once
+    # downscaled for the API (JPEGs at reduced DCT scale, small ones not at all) and once
+    # for stamping. Keeping the whole group decoded instead would hold k full-resolution
+    # images per worker, and one request instead of k is worth the extra decode
+    if analyzer and len(im_paths) > 1:
+        print(f"[INFO] Analyzing image content for {', '.join(p.name for p in im_paths)}...")
+        ai_filenames = analyzer.analyze_batch(im_paths, max_filename_length, k=len(im_paths))
+    
+    for im_path, ai_filename in zip(im_paths, ai_filenames):
+        _add_logo_single(
+            im_path, 
+            logo, 
+            save_dir, 
+            vertical_pos, 
+            horizontal_pos, 
+            padding, 
+            logo_scale, 
+            opacity,
+            suffix,
+            analyzer,
+            max_filename_length,
+            encoder,
+            ai_filename,
+            jpeg_quality
+        )
 
 def _add_logo_single(
     im_path: str | Path, 
-    logo_path: str | Path, 
+    logo: Image.Image, 
     save_dir: str | Path,
     vertical_pos: VerticalPosition = VerticalPosition.BOTTOM,
     horizontal_pos: HorizontalPosition = HorizontalPosition.CENTER,
@@ -103,20 +202,29 @@ def _add_logo_single(
     opacity: float = 1.0,
     suffix: str = "",
     analyzer: Optional[ImageAnalyzer] = None,
-    max_filename_length: int = 50
+    max_filename_length: int = 50,
+    encoder: Optional["_Encoder"] = None,
+    ai_filename: Optional[str] = None,
+    jpeg_quality: int = 85
 ) -> None:
     
+    im_path = Path(im_path)
+    save_dir = Path(save_dir)
+    
     try:
-        im = Image.open(im_path).convert('RGBA')
+        im = _to_compositing_mode(Image.open(im_path))
+        # Decode here so truncated or corrupt files are skipped like unreadable ones
+        im.load()
     except Exception as e:
         print(f"[WARNING] Image {im_path} could not be opened. Continuing. {e}")
         return
-        
-    try:
-        logo = Image.open(logo_path).convert('RGBA')
-    except Exception as e:
-        raise ValueError(f"[ERROR] Logo could not be opened: {e}")
-        return
+    
+    # Analyze the already decoded image before the logo is pasted onto it,
+    # unless a name was already generated (e.g. by a batch request)
+    if analyzer and ai_filename is None:
+        print(f"[INFO] Analyzing image content for {im_path.name}...")
+        ai_filename = analyzer.analyze_pil_image(im, im_path.stem, max_filename_length,
+                                                  image_path=im_path)
     
     # Process the image with logo
     result_im = _process_logo_on_image(
@@ -125,42 +233,107 @@ def _add_logo_single(
     )
 
     # Save the resulting image
-    im_path = Path(im_path)
-    
     # Determine the filename
+    name = im_path.stem
     if analyzer:
-        print(f"[INFO] Analyzing image content for {im_path.name}...")
-        ai_filename = analyzer.analyze_image(im_path, max_filename_length)
         if ai_filename:
             # Use AI-generated filename
-            if suffix:
-                save_path = Path(save_dir) / f"{ai_filename}{suffix}{im_path.suffix}"
-            else:
-                save_path = Path(save_dir) / f"{ai_filename}{im_path.suffix}"
-            print(f"[INFO] AI generated filename: {ai_filename}")
+            name = ai_filename
+            log.debug("AI generated filename: %s", ai_filename)
         else:
             # Fallback to original filename if AI analysis fails
             print(f"[WARNING] AI analysis failed, using original filename")
-            if suffix:
-                save_path = Path(save_dir) / f"{im_path.stem}{suffix}{im_path.suffix}"
-            else:
-                save_path = Path(save_dir) / im_path.name
-    else:
-        # Use original filename with optional suffix
-        if suffix:
-            save_path = Path(save_dir) / f"{im_path.stem}{suffix}{im_path.suffix}"
-        else:
-            save_path = Path(save_dir) / im_path.name
+    
+    # Original filename with optional suffix
+    ext = im_path.suffix
+    save_path = save_dir / f"{name}{suffix}{ext}"
 
     # no alpha channel for jpeg!
-    file_extension = save_path.suffix.lower()
-    if file_extension in ['.jpg', '.jpeg']:
+    file_extension = ext.lower()
+    if file_extension in ['.jpg', '.jpeg'] and result_im.mode != 'RGB':
         result_im = result_im.convert('RGB')
 
-    result_im.save(save_path)
+    if encoder:
+        encoder.submit(result_im, save_path, jpeg_quality)
+    else:
+        _save_image(result_im, save_path, jpeg_quality)
+
+
+def _save_image(im: Image.Image, save_path: Path, jpeg_quality: int = 85) -> None:
+    """Encode and write a finished image."""
+    file_extension = save_path.suffix.lower()
+    if file_extension in ['.jpg', '.jpeg']:
+        # Optimized Huffman tables and progressive scans make smaller files at the same quality
+        im.save(save_path, 'JPEG', quality=jpeg_quality, optimize=True, progressive=True, subsampling=2)
+    elif file_extension == '.png':
+        # Much faster than the default level 6 for slightly larger files
+        im.save(save_path, 'PNG', compress_level=1)
+    else:
+        im.save(save_path)
     print(f"[INFO] Saved image with logo to {save_path}")
 
 
+class _Encoder:
+    """Saves images on a dedicated thread pool so encoding overlaps with compositing."""
+    def __init__(self, max_workers: int):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        # One image per encoder thread and none queued behind them: together with the image
+        # each compositing thread holds, at most 2 * max_workers decoded images are in memory
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._futures = []
+
+    def submit(self, im: Image.Image, save_path: Path, jpeg_quality: int = 85) -> None:
+        self._slots.acquire()
+        future = self._executor.submit(_save_image, im, save_path, jpeg_quality)
+        future.add_done_callback(lambda f: self._slots.release())
+        self._futures.append(future)
+
+    def wait(self) -> None:
+        """Block until all images are written, re-raising the first encoding error."""
+        self._executor.shutdown(wait=True)
+        for future in self._futures:
+            future.result()
+
+
+def _to_compositing_mode(im: Image.Image) -> Image.Image:
+    """Keep images without alpha as RGB and convert everything else to RGBA.
+    
+    Pasting an RGBA logo onto an RGB image blends in a single pass, so there is no
+    need for an RGBA working copy (and a conversion back) when the image has no alpha.
+    """
+    if im.mode == 'RGB':
+        return im
+    return im.convert('RGBA')
+
+
+def _opacity_lut(opacity: float) -> list[int]:
+    """256-entry lookup table scaling alpha values by opacity, applied by Image.point in a single C pass."""
+    return [int(i * opacity) for i in range(256)]
+
+
+def _prepare_logo(logo: Image.Image, width: int, height: int, opacity: float) -> Image.Image:
+    """Resize the logo and apply opacity to its alpha channel."""
+    logo = logo.resize((width, height), Image.LANCZOS)
+
+    # Apply opacity if less than 1.0
+    if opacity < 1.0:
+        # The resized logo is already a fresh image, so its alpha can be modified in place
+        alpha = logo.getchannel('A')
+        alpha = alpha.point(_opacity_lut(opacity))
+        logo.putalpha(alpha)
+    elif logo.getchannel('A').getextrema()[0] == 255:
+        # Fully opaque, pasting can copy the pixels instead of blending them
+        logo = logo.convert('RGB')
+
+    return logo
+
+
+@functools.lru_cache(maxsize=32)
+def _prepared_logo(logo_id: int, width: int, height: int, opacity: float) -> Image.Image:
+    """_prepare_logo for a logo registered in _logos, memoized. Treat the result as read-only."""
+    return _prepare_logo(_logos[logo_id], width, height, opacity)
+
+
 def _calculate_position(
     im_width: int, 
     im_height: int, 
@@ -198,7 +371,7 @@ def _process_logo_on_image(
     logo_scale: float,
     opacity: float
 ) -> Image.Image:
-    """Apply logo processing to an image and return the result."""
+    """Apply logo processing to an image and return the result. The image is modified in place."""
     
     logo_width, logo_height = logo.size
     im_width, im_height = im.size
@@ -207,19 +380,13 @@ def _process_logo_on_image(
     new_width = int(im_width * logo_scale)
     scale_factor = new_width / logo_width
     new_height = int(logo_height * scale_factor)
-    logo = logo.resize((new_width, new_height), Image.LANCZOS)
+    if id(logo) in _logos:
+        # Same logo for the whole batch, so reuse it per target size and opacity
+        logo = _prepared_logo(id(logo), new_width, new_height, opacity)
+    else:
+        logo = _prepare_logo(logo, new_width, new_height, opacity)
     logo_width, logo_height = logo.size
 
-    # Apply opacity if less than 1.0
-    if opacity < 1.0:
-        # Create a copy to avoid modifying the original
-        logo_with_opacity = logo.copy()
-        # Apply opacity to alpha channel
-        alpha = logo_with_opacity.split()[-1]  # Get alpha channel
-        alpha = alpha.point(lambda p: int(p * opacity))
-        logo_with_opacity.putalpha(alpha)
-        logo = logo_with_opacity
-
     # Calculate position based on positioning options
     position = _calculate_position(
         im_width, im_height, 
@@ -228,11 +395,10 @@ def _process_logo_on_image(
         padding
     )
 
-    # Apply logo to image
-    result_im = im.copy()  # Don't modify the original
-    result_im.paste(logo, position, logo)
+    # Apply logo to image, only the logo's box is touched
+    im.paste(logo, position, logo if logo.mode == 'RGBA' else None)
     
-    return result_im
+    return im
     
     
 if __name__ == "__main__":
@@ -250,19 +416,34 @@ if __name__ == "__main__":
     parser.add_argument("--opacity", help="logo opacity (0.0 to 1.0)", type=float, default=1.0)
     parser.add_argument("--suffix", help="suffix to add to output filenames (before extension)", type=str, default="")
     parser.add_argument("--no-rec", help="turn off recursive image search", action="store_true")
+    parser.add_argument("--jpeg-quality", help="quality of saved JPEG images (1 to 95)", type=int, default=85)
+    parser.add_argument("--max-workers", "--concurrency", help=f"number of images processed in parallel (default: CPU count, {AI_NAMING_WORKERS} with AI naming)", type=int, default=None)
     
     # AI naming options
     parser.add_argument("--use-ai-naming", help="use AI to generate descriptive filenames", action="store_true")
     parser.add_argument("--openai-api-key", help="OpenAI API key (or set OPENAI_API_KEY env var)", type=str)
     parser.add_argument("--ai-model", help="OpenAI model to use for image analysis", type=str, default="gpt-4o-mini")
     parser.add_argument("--max-filename-length", help="maximum length for AI-generated filenames", type=int, default=50)
+    parser.add_argument("--no-name-cache", help="always ask the AI instead of reusing names from earlier runs", action="store_true")
+    parser.add_argument("--verbose", help="print debug output, e.g. the raw AI responses", action="store_true")
+    parser.add_argument("--ai-batch-size", help="number of images named per AI request (1 to send images one by one)", type=int, default=8)
     
     args = parser.parse_args()
     
+    logging.basicConfig(format="[%(levelname)s] %(message)s")
+    if args.verbose:
+        # Only this tool's debug output, not that of Pillow or the HTTP client
+        for name in (__name__, 'image_analyzer'):
+            logging.getLogger(name).setLevel(logging.DEBUG)
+    
     # Validate opacity
     if not 0.0 <= args.opacity <= 1.0:
         parser.error("Opacity must be between 0.0 and 1.0")
     
+    # Validate JPEG quality
+    if not 1 <= args.jpeg_quality <= 95:
+        parser.error("JPEG quality must be between 1 and 95")
+    
     # Validate logo scale
     if not 0.01 <= args.logo_scale <= 1.0:
         parser.error("Logo scale must be between 0.01 and 1.0")
@@ -271,7 +452,6 @@ if __name__ == "__main__":
     openai_api_key = args.openai_api_key
     if args.use_ai_naming and not openai_api_key:
         # Try to get from environment variable
-        import os
         openai_api_key = os.getenv('OPENAI_API_KEY')
         if not openai_api_key:
             parser.error("OpenAI API key is required when using --use-ai-naming. Provide via --openai-api-key or set OPENAI_API_KEY environment variable.")
@@ -298,6 +478,10 @@ if __name__ == "__main__":
         args.use_ai_naming,
         openai_api_key,
         args.ai_model,
-        args.max_filename_length
+        args.max_filename_length,
+        args.max_workers,
+        args.ai_batch_size,
+        args.jpeg_quality,
+        not args.no_name_cache
     )
     
\ No newline at end of file